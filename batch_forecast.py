@@ -0,0 +1,328 @@
+import argparse
+import inspect
+import json
+import os
+import time
+import pandas as pd
+from prophet import Prophet
+
+from forecast import get_db_connection, classify_trend, PROPHET_PARAMS
+
+# Entity name that means "every transaction combined" (what run_forecast() models)
+COMPANY = "ALL"
+
+# Entity name for transactions that have no department
+UNASSIGNED = "Unassigned"
+
+# Keyword arguments Prophet() accepts, used to reject typos in job files up front
+VALID_PARAMS = set(inspect.signature(Prophet).parameters)
+
+# Param values must be plain JSON scalars: they go into the fit-sharing key and
+# the 'params' column. Object-valued params (e.g. a holidays DataFrame) are rejected.
+PARAM_TYPES = (str, int, float, bool, type(None))
+
+DEFAULT_HORIZONS = [30, 60, 90]
+
+# Spacing between the as_of snapshots generated by default_jobs()
+SNAPSHOT_STEP_DAYS = 30
+
+
+def load_transactions():
+    """
+    Fetches daily spend per department in ONE query.
+    Transactions without a department are kept under UNASSIGNED so that
+    the ALL total matches run_forecast().
+    Every job in a batch is cut from this frame, so the database is hit once per run.
+    """
+    print("Batch: Fetching financial data...")
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    query = """
+    SELECT t.date, COALESCE(d.name, %s) AS entity, SUM(t.amount) AS total_spend
+    FROM transactions t
+    LEFT JOIN departments d ON t.dept_id = d.id
+    GROUP BY t.date, entity
+    ORDER BY t.date ASC
+    """
+    cursor.execute(query, (UNASSIGNED,))
+    result = cursor.fetchall()
+
+    cursor.close()
+    conn.close()
+
+    df = pd.DataFrame(result, columns=["date", "entity", "total_spend"])
+    df['ds'] = pd.to_datetime(df['date'])
+    # MySQL DECIMAL comes back as Decimal objects, Prophet wants floats
+    df['y'] = df['total_spend'].astype(float)
+    return df[['ds', 'entity', 'y']]
+
+
+def build_series(data, entity, as_of=None):
+    """
+    Cuts one Prophet-ready ('ds', 'y') series out of the shared frame.
+    'as_of' replays a past snapshot by dropping everything after that date.
+
+    Days without spend are filled with 0 (up to the last day in the data), so
+    "last 30 rows" always means "last 30 days" when computing burn rates.
+    """
+    if as_of is not None:
+        data = data[data['ds'] <= pd.Timestamp(as_of)]
+    if data.empty:
+        return pd.DataFrame(columns=['ds', 'y'])
+    last_day = data['ds'].max()
+
+    if entity != COMPANY:
+        data = data[data['entity'] == entity]
+    if data.empty:
+        return pd.DataFrame(columns=['ds', 'y'])
+
+    series = data.groupby('ds')['y'].sum()
+    days = pd.date_range(series.index.min(), last_day, freq='D', name='ds')
+    return series.reindex(days, fill_value=0.0).reset_index()
+
+
+def normalize_job(job):
+    """
+    Accepts either an (entity, horizon, params[, as_of]) tuple or a dict with the
+    same keys and returns a dict with defaults filled in.
+    """
+    if isinstance(job, dict):
+        entity = job.get("entity", COMPANY)
+        horizon = job.get("horizon", 90)
+        params = job.get("params") or {}
+        as_of = job.get("as_of")
+    else:
+        if len(job) not in (3, 4):
+            raise ValueError(f"Job tuples must be (entity, horizon, params[, as_of]), got {job!r}")
+        entity, horizon, params = job[:3]
+        params = params or {}
+        as_of = job[3] if len(job) == 4 else None
+
+    horizon = int(horizon)
+    if horizon <= 0:
+        raise ValueError(f"Horizon must be a positive number of days, got {horizon}")
+
+    unknown = set(params) - VALID_PARAMS
+    if unknown:
+        raise ValueError(f"Unknown Prophet params for entity '{entity}': {sorted(unknown)}")
+    for name, value in params.items():
+        if not isinstance(value, PARAM_TYPES):
+            raise ValueError(
+                f"Prophet param '{name}' for entity '{entity}' must be a string, number, "
+                f"bool or null, got {type(value).__name__}"
+            )
+
+    return {
+        "entity": entity,
+        "horizon": horizon,
+        "params": {**PROPHET_PARAMS, **params},
+        "as_of": str(pd.Timestamp(as_of).date()) if as_of is not None else None,
+    }
+
+
+def default_jobs(data, snapshots=1):
+    """
+    Every department plus the company total, at each default horizon.
+
+    snapshots > 1 adds older as_of snapshots, SNAPSHOT_STEP_DAYS apart, each of
+    which needs its own fits. Jobs are ordered horizon first, so a prefix of the
+    list covers every (entity, snapshot) fit before any horizon shares one.
+    """
+    entities = [COMPANY] + sorted(data['entity'].unique())
+    last_day = data['ds'].max()
+    as_of_dates = [None] + [
+        str((last_day - pd.Timedelta(days=SNAPSHOT_STEP_DAYS * i)).date())
+        for i in range(1, snapshots)
+    ]
+    return [
+        {"entity": entity, "horizon": horizon, "as_of": as_of}
+        for horizon in DEFAULT_HORIZONS
+        for as_of in as_of_dates
+        for entity in entities
+    ]
+
+
+def run_batch(jobs, data=None):
+    """
+    Runs many forecasts against one data load.
+
+    Jobs that share (entity, as_of, params) only differ by horizon, so they share
+    a single Prophet fit: the model is fitted once, predicted out to the longest
+    horizon in the group, and each job reads its own slice of that prediction.
+
+    Returns (results, stats):
+    - results: one row per forecast day per job, with the job's summary metrics
+      repeated on each row (they compress to almost nothing in Parquet).
+    - stats: job/fit counts and throughput for the run. 'forecasts' and 'fits'
+      only count work that succeeded; jobs that ended as ERROR are in 'failed'.
+    """
+    start = time.perf_counter()
+
+    jobs = [normalize_job(job) for job in jobs]
+    if not jobs:
+        raise ValueError("run_batch() needs at least one job")
+    if data is None:
+        data = load_transactions()
+
+    # Group jobs by everything that affects the fit (i.e. everything but the horizon)
+    groups = {}
+    for job_id, job in enumerate(jobs):
+        key = (job["entity"], job["as_of"], json.dumps(job["params"], sort_keys=True))
+        groups.setdefault(key, []).append(job_id)
+
+    print(f"Batch: {len(jobs)} jobs -> {len(groups)} model fits to run")
+
+    frames = []
+    fits = 0
+    failed = 0
+    for (entity, as_of, params_key), job_ids in groups.items():
+        series = build_series(data, entity, as_of)
+
+        if series.empty:
+            error = f"No data for entity '{entity}' (as_of={as_of})"
+            print(f"Batch: {error}, skipping.")
+            frames.extend(_failed_rows(job_ids, jobs, error))
+            failed += len(job_ids)
+            continue
+
+        max_horizon = max(jobs[job_id]["horizon"] for job_id in job_ids)
+        try:
+            m = Prophet(**json.loads(params_key))
+            m.fit(series)
+            future = m.make_future_dataframe(periods=max_horizon, include_history=False)
+            forecast = m.predict(future)[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+        except Exception as e:
+            # One bad group (e.g. too little history) must not sink the whole batch
+            error = f"Forecast failed for entity '{entity}' (as_of={as_of}): {e}"
+            print(f"Batch: {error}")
+            frames.extend(_failed_rows(job_ids, jobs, error))
+            failed += len(job_ids)
+            continue
+        fits += 1
+
+        # Same burn definitions as run_forecast(): last 30 actual days vs
+        # the last 30 days of the forecast window, scaled to a month
+        current_burn = series['y'].tail(30).mean()
+
+        for job_id in job_ids:
+            window = forecast.head(jobs[job_id]["horizon"])
+            predicted_burn = window['yhat'].tail(30).mean()
+            trend = classify_trend(current_burn, predicted_burn)
+            frames.append(_job_rows(
+                job_id, jobs[job_id], window, trend,
+                current_burn * 30, predicted_burn * 30
+            ))
+
+    results = pd.concat(frames, ignore_index=True)
+    for column in ["entity", "params", "as_of", "trend", "error"]:
+        results[column] = results[column].astype("category")
+
+    elapsed = time.perf_counter() - start
+    forecasts = len(jobs) - failed
+    stats = {
+        "jobs": len(jobs),
+        "forecasts": forecasts,
+        "fits": fits,
+        "failed": failed,
+        "seconds": elapsed,
+        "forecasts_per_minute": forecasts / elapsed * 60 if elapsed > 0 else 0.0,
+    }
+    print(
+        f"Batch: Finished {forecasts} forecasts ({fits} fits, {failed} failed) in "
+        f"{elapsed:.1f}s -> {stats['forecasts_per_minute']:.1f} forecasts/min"
+    )
+    return results, stats
+
+
+def _job_rows(job_id, job, window, trend, current_burn, predicted_burn, error=None):
+    """Flattens one job's forecast window into result rows."""
+    if window is None:
+        # Keep failed jobs visible in the output as a single empty row
+        window = pd.DataFrame({"ds": [pd.NaT], "yhat": [float("nan")],
+                               "yhat_lower": [float("nan")], "yhat_upper": [float("nan")]})
+
+    rows = window.reset_index(drop=True).copy()
+    rows.insert(0, "job_id", job_id)
+    rows.insert(1, "entity", job["entity"])
+    rows.insert(2, "horizon", job["horizon"])
+    rows.insert(3, "as_of", job["as_of"])
+    rows.insert(4, "params", json.dumps(job["params"], sort_keys=True))
+    rows["trend"] = trend
+    rows["current_burn"] = current_burn
+    rows["predicted_burn"] = predicted_burn
+    rows["error"] = error
+    return rows
+
+
+def _failed_rows(job_ids, jobs, error):
+    """One ERROR row per job in a group that produced no forecast."""
+    return [
+        _job_rows(job_id, jobs[job_id], None, "ERROR", float("nan"), float("nan"), error)
+        for job_id in job_ids
+    ]
+
+
+def write_results(results, path):
+    """Writes the batch output as a single Parquet file (needs pyarrow)."""
+    results.to_parquet(path, index=False, compression="zstd")
+    print(f"Batch: Results written to {path}")
+
+
+def benchmark(jobs, data, counts):
+    """
+    Re-runs the batch on growing prefixes of the job list to show how
+    throughput scales. Data is loaded once and reused for every run, and one
+    warm-up job runs first so the one-off Stan model load is not timed.
+    """
+    run_batch(jobs[:1], data=data)
+
+    rows = []
+    for count in counts:
+        _, stats = run_batch(jobs[:count], data=data)
+        rows.append(stats)
+
+    table = pd.DataFrame(rows)
+    # How many forecasts each fit served, i.e. how much deduplication saved
+    table["forecasts_per_fit"] = table["forecasts"] / table["fits"].where(table["fits"] > 0)
+    return table
+
+
+# --- CLI (e.g. for a nightly cron job) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch of burn-rate forecasts.")
+    parser.add_argument("--jobs", help="JSON file with a list of {entity, horizon, params, as_of} jobs. "
+                                       "Defaults to every department + ALL at 30/60/90 days.")
+    parser.add_argument("--snapshots", type=int, default=1,
+                        help=f"Number of as_of snapshots for the default jobs: the latest data plus "
+                             f"older cuts {SNAPSHOT_STEP_DAYS} days apart. 1 = latest data only.")
+    parser.add_argument("--out", default="static/batch_forecast.parquet", help="Output Parquet file.")
+    parser.add_argument("--bench", help="Comma-separated job counts, e.g. 1,5,10,25. "
+                                        "Prints forecasts/min for each instead of writing results.")
+    args = parser.parse_args()
+    if args.snapshots < 1:
+        parser.error("--snapshots must be at least 1")
+
+    data = load_transactions()
+
+    if args.jobs:
+        with open(args.jobs, "r") as f:
+            jobs = json.load(f)
+    else:
+        jobs = default_jobs(data, snapshots=args.snapshots)
+
+    if args.bench:
+        counts = [int(c) for c in args.bench.split(",")]
+        if min(counts) < 1:
+            parser.error("--bench job counts must be at least 1")
+        if max(counts) > len(jobs):
+            parser.error(f"--bench asks for {max(counts)} jobs but only {len(jobs)} are defined")
+        print("\n--- THROUGHPUT ---")
+        print(benchmark(jobs, data, counts).to_string(index=False, float_format="%.1f"))
+    else:
+        results, _ = run_batch(jobs, data=data)
+        out_dir = os.path.dirname(args.out)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir)
+        write_results(results, args.out)
@@ -11,6 +11,10 @@ from dotenv import load_dotenv
 # Load env variables
 load_dotenv()
 
+# Prophet settings for the burn-rate model (batch_forecast.py uses the same ones)
+# changepoint_prior_scale=0.5 makes it SENSITIVE to recent changes (like our crash)
+PROPHET_PARAMS = {"daily_seasonality": True, "changepoint_prior_scale": 0.5}
+
 def get_db_connection():
     return mysql.connector.connect(
         host=os.getenv("DB_HOST", "localhost"),
@@ -19,6 +23,17 @@ def get_db_connection():
         database="financial_risk_db"
     )
 
+def classify_trend(current_burn, predicted_burn):
+    """
+    Labels the projected burn relative to the recent actual burn.
+    Shared by the interactive report and the batch runner so both agree.
+    """
+    if predicted_burn > current_burn * 1.5:
+        return "CRITICAL SPIKE"
+    elif predicted_burn > current_burn * 1.1:
+        return "INCREASING (RISK)"
+    return "STABLE"
+
 def run_forecast():
     """
     1. Fetches transaction data.
@@ -62,9 +77,8 @@ def run_forecast():
     print(f"Oracle: Training model on {len(df)} days of data...")
 
     # 3. TRAIN MODEL
-    # yearly_seasonality=True helps it understand annual budgets
-    # changepoint_prior_scale=0.5 makes it SENSITIVE to recent changes (like our crash)
-    m = Prophet(daily_seasonality=True, changepoint_prior_scale=0.5) 
+    # See PROPHET_PARAMS above for why these settings
+    m = Prophet(**PROPHET_PARAMS)
     m.fit(df)
 
     # 4. PREDICT FUTURE (90 Days)
@@ -76,11 +90,7 @@ def run_forecast():
     current_burn = df['y'].tail(30).mean() # Last 30 days actuals
     predicted_burn = forecast['yhat'].tail(30).mean() # Next 30 days prediction
     
-    trend = "STABLE"
-    if predicted_burn > current_burn * 1.5:
-        trend = "CRITICAL SPIKE"
-    elif predicted_burn > current_burn * 1.1:
-        trend = "INCREASING (RISK)"
+    trend = classify_trend(current_burn, predicted_burn)
 
     # 6. SAVE PLOT (For the UI)
     plt.figure(figsize=(10, 6))
@@ -0,0 +1,157 @@
+import pandas as pd
+import pytest
+
+import batch_forecast
+from batch_forecast import COMPANY, build_series, default_jobs, normalize_job, run_batch
+from forecast import PROPHET_PARAMS
+
+
+class FakeProphet:
+    """Stands in for Prophet: predicts a flat line at the series mean and counts fits."""
+
+    fits = 0
+
+    def __init__(self, **params):
+        self.params = params
+
+    def fit(self, df):
+        if len(df) < 2:
+            raise ValueError("Dataframe has less than 2 non-NaN rows.")
+        FakeProphet.fits += 1
+        self.history = df
+        return self
+
+    def make_future_dataframe(self, periods, include_history=True):
+        start = self.history['ds'].max() + pd.Timedelta(days=1)
+        return pd.DataFrame({"ds": pd.date_range(start, periods=periods, freq='D')})
+
+    def predict(self, future):
+        level = self.history['y'].mean()
+        return future.assign(yhat=level, yhat_lower=level * 0.9, yhat_upper=level * 1.1)
+
+
+@pytest.fixture
+def fake_prophet(monkeypatch):
+    FakeProphet.fits = 0
+    monkeypatch.setattr(batch_forecast, "Prophet", FakeProphet)
+    return FakeProphet
+
+
+@pytest.fixture
+def data():
+    days = pd.date_range("2025-01-01", periods=60, freq='D')
+    sales = pd.DataFrame({"ds": days, "entity": "Sales", "y": 100.0})
+    # HR only spends every other day
+    hr = pd.DataFrame({"ds": days[::2], "entity": "HR", "y": 50.0})
+    return pd.concat([sales, hr], ignore_index=True)
+
+
+def test_normalize_job_tuple_fills_defaults():
+    job = normalize_job(("Sales", "30", None))
+    assert job == {"entity": "Sales", "horizon": 30, "params": PROPHET_PARAMS, "as_of": None}
+
+    job = normalize_job(("Sales", 30, {}, "2025-02-01"))
+    assert job["as_of"] == "2025-02-01"
+
+
+def test_normalize_job_rejects_bad_tuple_length():
+    with pytest.raises(ValueError, match="entity, horizon, params"):
+        normalize_job(("Sales", 30))
+
+
+def test_normalize_job_dict_overrides_params():
+    job = normalize_job({"horizon": 60, "params": {"changepoint_prior_scale": 0.1}, "as_of": "2025-02-01"})
+    assert job["entity"] == COMPANY
+    assert job["params"]["changepoint_prior_scale"] == 0.1
+    assert job["params"]["daily_seasonality"] is True
+    assert job["as_of"] == "2025-02-01"
+
+
+@pytest.mark.parametrize("horizon", [0, -5])
+def test_normalize_job_rejects_non_positive_horizon(horizon):
+    with pytest.raises(ValueError):
+        normalize_job(("Sales", horizon, {}))
+
+
+def test_normalize_job_rejects_unknown_params():
+    with pytest.raises(ValueError, match="bogus"):
+        normalize_job(("Sales", 30, {"bogus": 1}))
+
+
+def test_normalize_job_rejects_object_params():
+    holidays = pd.DataFrame({"holiday": ["x"], "ds": [pd.Timestamp("2025-01-01")]})
+    with pytest.raises(ValueError, match="holidays"):
+        normalize_job(("Sales", 30, {"holidays": holidays}))
+
+
+def test_default_jobs_snapshots(data):
+    jobs = default_jobs(data, snapshots=2)
+    # (ALL, HR, Sales) x 2 snapshots x 3 horizons, first horizon covers every fit
+    assert len(jobs) == 18
+    assert {job["as_of"] for job in jobs} == {None, "2025-01-30"}
+    assert {job["horizon"] for job in jobs[:6]} == {30}
+
+
+def test_build_series_company_total(data):
+    series = build_series(data, COMPANY)
+    assert len(series) == 60
+    assert series['y'].iloc[0] == 150.0
+    assert series['y'].iloc[1] == 100.0
+
+
+def test_build_series_fills_missing_days(data):
+    series = build_series(data, "HR")
+    assert len(series) == 60
+    assert series['y'].tolist()[:4] == [50.0, 0.0, 50.0, 0.0]
+
+
+def test_build_series_as_of_cut(data):
+    series = build_series(data, "Sales", as_of="2025-01-10")
+    assert series['ds'].max() == pd.Timestamp("2025-01-10")
+    assert len(series) == 10
+
+
+def test_build_series_unknown_entity_is_empty(data):
+    assert build_series(data, "Nope").empty
+
+
+def test_run_batch_shares_fits_across_horizons(fake_prophet, data):
+    jobs = [
+        ("Sales", 30, {}),
+        ("Sales", 60, {}),
+        ("Sales", 90, {}),
+        ("Sales", 30, {"changepoint_prior_scale": 0.1}),
+        (COMPANY, 30, {}),
+    ]
+    results, stats = run_batch(jobs, data=data)
+
+    assert stats["jobs"] == 5
+    assert stats["forecasts"] == 5
+    assert stats["fits"] == 3
+    assert stats["failed"] == 0
+    assert fake_prophet.fits == 3
+
+    # Each job gets exactly its own horizon, starting the day after the history
+    sizes = results.groupby("job_id").size().to_dict()
+    assert sizes == {0: 30, 1: 60, 2: 90, 3: 30, 4: 30}
+    first_days = results.groupby("job_id")['ds'].min()
+    assert (first_days == pd.Timestamp("2025-03-02")).all()
+
+
+def test_run_batch_keeps_going_after_failed_group(fake_prophet, data):
+    jobs = [
+        {"entity": "Sales", "horizon": 30},
+        {"entity": "Sales", "horizon": 30, "as_of": "2025-01-01"},  # one row of history
+        {"entity": "Nope", "horizon": 30},
+    ]
+    results, stats = run_batch(jobs, data=data)
+
+    per_job = results.groupby("job_id", observed=True)[['trend', 'error']].first()
+    assert per_job['trend'].tolist() == ["STABLE", "ERROR", "ERROR"]
+    assert pd.isna(per_job['error'].iloc[0])
+    assert "less than 2 non-NaN rows" in per_job['error'].iloc[1]
+    assert per_job['error'].iloc[2].startswith("No data for entity 'Nope'")
+    assert results['error'].dtype == "category"
+    assert (stats["forecasts"], stats["fits"], stats["failed"]) == (1, 1, 2)
+    assert results['current_burn'].dtype == "float64"
+    assert results['predicted_burn'].dtype == "float64"